@@ -7,16 +7,15 @@ This script assumes it is being run from the immediate parent directory of
 www (in which it may find the causes file).
 """
 
-from random import randint
+from __future__ import print_function
+import random
 
 def main():
     """Do what we do."""
-    lines = []
     with open("causes.txt", "r") as f:
-        for line in f:
-            if len(line) != 1 and line[0] != '#':
-                lines.append(line[:-1])
-    print lines[randint(0, len(lines) - 1)]
+        lines = [line.rstrip('\n') for line in f
+                 if line.strip() and not line.startswith('#')]
+    print(random.choice(lines))
 
 if __name__ == '__main__':
     main()
@@ -5,11 +5,16 @@
 
 from __future__ import print_function
 import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
 import dateutil.parser
 import jinja2
 import os
 from PIL import Image
 import re
+import shutil
+import sys
 
 def read_page_spec(filename):
     """Read a page spec, return a dict.
@@ -19,40 +24,122 @@ def read_page_spec(filename):
     lines that match anything not beginning with ':'.
 
     The returned dict maches each :key: (sans fore and aft ":") with
-    the non-key lines that follow.
+    the non-key lines that follow.  Trailing white space is removed
+    from every line.
 
     """
     spec = {}
     key = None
     value = []
-    pattern = re.compile(r'^:\w+:$')
     with open(filename, 'r') as page_spec_fp:
-        for line in page_spec_fp.readlines():
+        for line in page_spec_fp:
             line = line.rstrip()
-            if re.match(pattern, line):
+            # This is re.match(r'^:\w+:$', line), but cheaper, since
+            # most lines fail on the first character.
+            if line[:1] == ':' and line[-1:] == ':' and len(line) > 2 \
+               and line[1:-1].replace('_', 'a').isalnum():
                 if key is not None:
                     # This is not our first key, so output the (key,
                     # value) we've collected thus far.
                     spec[key] = '\n'.join(value)
                     value = []
-                key = line[1:-1]
+                # Interned keys compare by identity with the string
+                # literals we look them up with.
+                key = sys.intern(line[1:-1])
             else:
                 value.append(line)
     if key is not None:
         spec[key] = '\n'.join(value)
     return spec
 
+# Template environments, keyed by template directory, so that each
+# process compiles a given template once.
+_template_environments = {}
+
+def template_environment(template_dir):
+    """Return the jinja2 environment for templates in template_dir.
+
+    The bytecode cache lets later runs skip parsing and compiling
+    templates that haven't changed.  Templates don't change during a
+    build, so there's no need to check them for changes on every use,
+    and a site has few enough of them to keep them all in memory.
+    """
+    env = _template_environments.get(template_dir)
+    if env is None:
+        env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(template_dir),
+            bytecode_cache=jinja2.FileSystemBytecodeCache(),
+            auto_reload=False,
+            cache_size=-1)
+        _template_environments[template_dir] = env
+    return env
+
+# File actions for TimestampCompositorHelper.write().  These may run
+# in worker processes, so they live at module level, where pickle can
+# find them, and take only picklable arguments.
+
+def copy_file(dest_filename, source_filename):
+    """Copy source_file to dest_file."""
+    shutil.copyfile(source_filename, dest_filename)
+
+def copy_image(dest_filename, source_filename):
+    """Copy source image to destination image(s).
+
+    If the image format doesn't change, copy the bytes rather than
+    decoding and re-encoding the image.
+    """
+    source_ext = os.path.splitext(source_filename)[1].lower()
+    dest_ext = os.path.splitext(dest_filename)[1].lower()
+    if source_ext == dest_ext:
+        shutil.copyfile(source_filename, dest_filename)
+    else:
+        Image.open(source_filename).save(dest_filename)
+
+def render_page(dest_filename, source_filename, template_root,
+                template_name):
+    """Render source to destination.
+
+    The source filename points to a spec file.
+    The desitination filename points to the html file we'll write.
+    The template is named by its loader root and its name there.
+    (Compiled templates don't pickle.)  Loading by name from the root,
+    rather than from the template file's own directory, keeps extends
+    and include working for templates in subdirectories.
+    """
+    template = template_environment(template_root).get_template(
+        template_name)
+    page = template.render(read_page_spec(source_filename))
+    write_bytes(dest_filename, page.encode('utf-8'))
+
+def write_bytes(filename, data):
+    """Write data to filename with as few system calls as we can.
+
+    Skipping the io module's buffering and text layers matters when we
+    write many small pages.
+    """
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            # A write may be partial, although rarely for regular files.
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
 # Compositors have three public methods:
 #
-#   * A function init() taking one argument, a boolean (dryrun).
+#   * A function init() taking two arguments, booleans (dryrun and
+#     verbose).  Compositors are constructed from within the source
+#     directory, and may note it then.
 #
 #   * A function composite(), which composites a page (to be stored
-#     pending a future call to write()) given a content filename and
-#     a template.
+#     pending a future call to write()) given a content filename, a
+#     template, and, if known, the file's modification time.
 #
-#   * A function write(), which writes out the stored pages.  Calling
-#     write() should be the last interaction the compositor has with
-#     the world.
+#   * A function write(), which writes out the stored pages under the
+#     directory production_path, given a concurrent.futures executor
+#     on which to do the work.  Calling write() should be the last
+#     interaction the compositor has with the world.
 
 class NullCompositor(object):
     """A compositor that does nothing.
@@ -61,11 +148,11 @@ class NullCompositor(object):
         """Nothing to do."""
         pass
 
-    def composite(self, filename, template):
+    def composite(self, filename, template, mtime=None):
         """Nothing to do."""
         pass
 
-    def write(self):
+    def write(self, production_path, executor=None):
         """Nothing to do."""
         pass
 
@@ -80,25 +167,20 @@ class CopyCompositor(object):
         self.verbose = verbose
         self.timestamp_helper = TimestampCompositorHelper(dryrun, verbose)
 
-    def composite(self, filename, _):
+    def composite(self, filename, _, mtime=None):
         """Note a file to (maybe) copy.
         """
         if self.dryrun:
             print('CopyCompositor: ({fn})'.format(fn=filename))
             return
-        self.timestamp_helper.composite(filename)
+        self.timestamp_helper.composite(filename, mtime)
 
-    def write(self):
+    def write(self, production_path, executor=None):
         """Write my state.  This is my last contact with the world.
         """
         if self.dryrun:
             return
-        def copy_file(dest_filename, source_filename):
-            """Copy source_file to dest_file."""
-            with open(source_filename, 'rb') as fp_source:
-                with open(dest_filename, 'wb') as fp_dest:
-                    fp_dest.write(fp_source.read())
-        self.timestamp_helper.write(copy_file)
+        self.timestamp_helper.write(copy_file, production_path, executor)
 
 class StaticCompositor(object):
     """A singleton page compositor.
@@ -112,12 +194,14 @@ class StaticCompositor(object):
         """
         self.dryrun = dryrun
         self.verbose = verbose
-        self.source_dir = ''
+        self.source_dir = os.getcwd()
+        # Prefix for turning relative filenames into source paths.
+        self.source_prefix = os.path.join(self.source_dir, '')
         self.timestamp_helper = TimestampCompositorHelper(dryrun, verbose)
         # A mapping of filenames to templates.
         self.pages = {}
 
-    def composite(self, filename, template):
+    def composite(self, filename, template, mtime=None):
         """Prepare a page.
 
         Given a path (filename) and a template, prepare a page.
@@ -125,28 +209,24 @@ class StaticCompositor(object):
         if self.dryrun:
             print('StaticCompositor: ({fn})'.format(fn=filename))
             return
-        if '' == self.source_dir:
-            self.source_dir = os.getcwd()
-        self.pages[self.source_dir + '/' + filename] = template
-        self.timestamp_helper.composite(filename)
+        self.pages[self.source_prefix + filename] = template
+        self.timestamp_helper.composite(filename, mtime)
 
-    def write(self):
+    def write(self, production_path, executor=None):
         """Write my state.  This is my last contact with the world.
         """
         if self.dryrun:
             return
-        def static_render(dest_filename, source_filename):
-            """Render source to destination.
-
-            The source filename points to a spec file.
-            The desitination filename points to the html file we'll write.
-            """
-            value_map = read_page_spec(source_filename)
-            template = self.pages[source_filename]
-            page = template.render(value_map)
-            with open(dest_filename, 'w') as page_fp:
-                page_fp.write(page)
-        self.timestamp_helper.write(static_render)
+        # Site loads templates through template_environment(), so the
+        # loader's search path is the root to hand the workers.
+        # Each page carries only its own template, so workers aren't
+        # sent the whole site's worth for every chunk.
+        page_templates = {
+            source_filename: (template.environment.loader.searchpath[0],
+                              template.name)
+            for source_filename, template in self.pages.items()}
+        self.timestamp_helper.write(render_page, production_path, executor,
+                                    page_templates)
 
 class ImageCompositor(object):
     """An image compositor.
@@ -155,38 +235,32 @@ class ImageCompositor(object):
     offer more than one size for better reactivity.
 
     """
-    # If True, write() becomes a no-op.
-    dryrun = False
-
-    # Map image filenames to image modification time.
-    images = {}
-
     def __init__(self, dryrun, verbose):
         """Set up.  This is my first contact with the world.
         """
+        # If dryrun == True, write() becomes a no-op.
         self.dryrun = dryrun
-        self.source_dir = ''
+        self.source_dir = os.getcwd()
         self.verbose = verbose
         self.timestamp_helper = TimestampCompositorHelper(dryrun, verbose)
+        # Map image filenames to image modification time.
+        self.images = {}
 
-    def composite(self, filename, _):
+    def composite(self, filename, _, mtime=None):
         """Note an image to (maybe) copy.
         """
         # TODO(jeff@purple.com): How do I specify multiple resolutions?
         if self.dryrun:
             print('ImageCompositor: ({fn})'.format(fn=filename))
             return
-        self.timestamp_helper.composite(filename)
+        self.timestamp_helper.composite(filename, mtime)
 
-    def write(self):
+    def write(self, production_path, executor=None):
         """Write my state.  This is my last contact with the world.
         """
         if self.dryrun:
             return
-        def copy_image(dest_filename, source_filename):
-            """Copy source image to destination image(s)."""
-            Image.open(source_filename).save(dest_filename)
-        self.timestamp_helper.write(copy_image)
+        self.timestamp_helper.write(copy_image, production_path, executor)
 
 class BlogCompositor(object):
     """A singleton page compositor.
@@ -211,30 +285,25 @@ class BlogCompositor(object):
     they permit moving within a keyword sequence.
 
     """
-    # If True, write() becomes a no-op.
-    dryrun = False
-
-    # A mapping of filenames to (template, dictionary) pairs.  The
-    # dictionaries are for rendering the templates, but are missing
-    # the keys 'next_page' and 'previous_page', which can only be
-    # computed at the end once the entire sequence is known.
-    pre_pages = {}
-
-    # Slugs for us are string representations of publication dates.
-    # Here we'll map all the slugs we've seen to the filenames that
-    # should become visible on that date.
-    slugs = {}
-
-    # Keep track of all keywords encountered.
-    keywords = set('')
-
     def __init__(self, dryrun, verbose):
         """Set up.  This is my first contact with the world.
         """
+        # If dryrun == True, write() becomes a no-op.
         self.dryrun = dryrun
         self.verbose = verbose
-
-    def composite(self, filename, template):
+        # A mapping of filenames to (template, dictionary) pairs.  The
+        # dictionaries are for rendering the templates, but are missing
+        # the keys 'next_page' and 'previous_page', which can only be
+        # computed at the end once the entire sequence is known.
+        self.pre_pages = {}
+        # Slugs for us are string representations of publication dates.
+        # Here we'll map all the slugs we've seen to the filenames that
+        # should become visible on that date.
+        self.slugs = defaultdict(set)
+        # Keep track of all keywords encountered.
+        self.keywords = set()
+
+    def composite(self, filename, template, mtime=None):
         """Prepare a page.
 
         Given a path (filename) and a template, prepare to prepare a page.
@@ -247,21 +316,26 @@ class BlogCompositor(object):
             print('{fn} has no publication date, ignored.'.format(fn=filename))
             return
         # Publication date should be of form YYYY-MM-DD, but, in the
-        # end, anything understandable by dateutil.parser().
-        publication_date = dateutil.parser.parse(value_map['publication_date'])
-        slug = '{y}-{m:02d}-{d:02d}'.format(
-            y=publication_date.year,
-            m=publication_date.month,
-            d=publication_date.day)
+        # end, anything understandable by dateutil.parser().  The
+        # former is much faster to parse, so try it first.
+        publication_date_string = value_map['publication_date'].strip()
+        try:
+            publication_date = date.fromisoformat(publication_date_string)
+        except ValueError:
+            publication_date = dateutil.parser.parse(
+                publication_date_string).date()
+        slug = publication_date.isoformat()
         value_map['slug'] = slug
-        if slug in self.slugs:
-            self.slugs[slug].add([filename])
-        else:
-            self.slugs[slug] = set([filename])
-        self.keywords.update(value_map.get('keywords', '').split(','))
+        self.slugs[slug].add(filename)
+        keywords = value_map.get('keywords')
+        if keywords:
+            # Allow white space after the commas, as in "a, b".
+            stripped = (keyword.strip() for keyword in keywords.split(','))
+            self.keywords.update(
+                sys.intern(keyword) for keyword in stripped if keyword)
         self.pre_pages[filename] = (template, value_map)
 
-    def write(self):
+    def write(self, production_path, executor=None):
         """Write my state.  This is my last contact with the world.
 
         Here's the plan:
@@ -298,76 +372,100 @@ class TimestampCompositorHelper(object):
         """
         self.dryrun = dryrun
         self.verbose = verbose
-        self.source_dir = ''
+        self.source_dir = os.getcwd()
+        # Prefix for turning relative filenames into source paths.
+        self.source_prefix = os.path.join(self.source_dir, '')
         # Map filenames to modification times.
         self.files = {}
 
-    def composite(self, filename):
+    def composite(self, filename, mtime=None):
         """Note the modtime of a file to (maybe) process.
+
+        If the caller already knows the file's modification time
+        (mtime), we don't need to stat the file again.
         """
-        if '' == self.source_dir:
-            self.source_dir = os.getcwd()
         if self.dryrun:
             print('TimestampCompositorHelper: ({fn})'.format(fn=filename))
             return
-        try:
-            src_time = os.stat(filename).st_mtime
-        except OSError as error:
-            print("Can't stat source file {fn}: {err}".format(
-                fn=filename,
-                err=str(error)))
+        if mtime is not None:
+            src_time = mtime
+        else:
+            try:
+                src_time = os.stat(filename).st_mtime
+            except OSError as error:
+                print("Can't stat source file {fn}: {err}".format(
+                    fn=filename,
+                    err=str(error)))
+                return
         self.files[filename] = src_time
 
-    def write(self, file_action):
+    def write(self, file_action, production_path, executor=None,
+              extra_args=None):
         """Perform file_action if destination is not newer than source.
 
-        The function file_action should take two arguments: a source
-        file path and a destination file path.
+        The function file_action should take two arguments: a
+        destination file path and a source file path.  Destination
+        paths are our relative filenames under production_path.  If
+        extra_args is given, it maps source paths to tuples of further
+        arguments to pass file_action for that file alone.  If an
+        executor is given, the actions run on it, in which case
+        file_action and its arguments must be picklable for the sake
+        of process pools.
         """
         if self.dryrun:
             return
+        # List each destination directory once rather than stat'ing
+        # every file.  Files that don't exist yet, which is all of them
+        # on a fresh build, then cost nothing further.
+        dest_filenames = []
+        source_filenames = []
+        extra_arguments = []
+        files_by_dir = defaultdict(dict)
         for filename, src_time in self.files.items():
+            dirname, basename = os.path.split(filename)
+            files_by_dir[dirname][basename] = src_time
+        for dirname, files in files_by_dir.items():
             try:
-                dst_time = os.stat(filename).st_mtime
+                with os.scandir(os.path.join(production_path, dirname)) \
+                        as dir_entries:
+                    entries = {entry.name: entry for entry in dir_entries}
             except OSError:
-                # It's reasonable that it doesn't exist, but trigger an update.
-                dst_time = 0
-            try:
-                src_time = self.files[filename]
-            except KeyError:
-                # This shouldn't happen.
-                print('Missing source file and mtime: ' + filename)
-                return
-            needs_update = (dst_time < src_time)
-            if needs_update:
-                # TODO(jeff@purple.com): Write multiple sizes.
-                source_filename = self.source_dir + '/' + filename
-                print('Write: source="{sf}", file="{fn}"'.format(
-                    sf=source_filename, fn=filename))
-                file_action(filename, source_filename)
+                entries = {}
+            for basename, src_time in files.items():
+                filename = os.path.join(dirname, basename)
+                try:
+                    dst_time = entries[basename].stat().st_mtime
+                except (KeyError, OSError):
+                    # It's reasonable that it doesn't exist, but
+                    # trigger an update.
+                    dst_time = 0
+                needs_update = (dst_time < src_time)
+                if needs_update:
+                    # TODO(jeff@purple.com): Write multiple sizes.
+                    source_filename = self.source_prefix + filename
+                    print('Write: source="{sf}", file="{fn}"'.format(
+                        sf=source_filename, fn=filename))
+                    dest_filenames.append(
+                        os.path.join(production_path, filename))
+                    source_filenames.append(source_filename)
+                    if extra_args is not None:
+                        extra_arguments.append(extra_args[source_filename])
+        # One sequence per argument of file_action.
+        arguments = [dest_filenames, source_filenames]
+        arguments.extend(zip(*extra_arguments))
+        if executor is None:
+            for action_args in zip(*arguments):
+                file_action(*action_args)
+        else:
+            # Iterating the results re-raises any exception in a worker.
+            for dummy_result in executor.map(file_action, *arguments,
+                                             chunksize=32):
+                pass
 
 class Site(object):
     """Encapsulate a web site's specification.
 
     """
-    # A list of directories (in top-down order) whose existance we will
-    # need to ensure in order to write the site.
-    directories = []
-
-    # Map regex to (template, compositor instance).
-    actions = {}
-
-    # A list of regex's, such that the first match while iterating is
-    # the correct match.
-    regexes = []
-
-    # Don't read template files more than once.  This is a map from
-    # template filename to the compiled contents of those files.
-    templates = {}
-
-    # Where to find page specification files.
-    source_path = ''
-
     def __init__(self, site_config_path, source_path, dryrun, verbose):
         """Read and parse the site config file.
 
@@ -384,80 +482,196 @@ class Site(object):
         If dryrun is True, don't write the site, just indicate what we
         would have done.
 
+        Construct the Site from within source_path, since that's where
+        the compositors it creates expect to be.
+
         """
+        # Where to find page specification files.
         self.source_path = source_path + '/'
         self.dryrun = dryrun
         self.verbose = verbose
+        # A list of directories (in top-down order) whose existance we
+        # will need to ensure in order to write the site.
+        self.directories = []
+        # A list of (regex, template, compositor instance) tuples, such
+        # that the first regex to match while iterating is the correct
+        # match.
+        self.compiled_actions = []
+        # A single regex equivalent to trying each of compiled_actions'
+        # regexes in turn, or None if we must try them in turn.
+        self.combined_regex = None
+        # Don't read template files more than once, and not at all
+        # until we need them.  This is a map from template filename to
+        # the compiled contents of those files.
+        self.templates = {}
         if self.dryrun:
             print('Dry run.')
+        # Templates live alongside the config file.  We load templates
+        # lazily, by which time we may have changed directory, so the
+        # loader needs an absolute path.
+        self.env = template_environment(os.path.abspath(site_config_path))
         with open(site_config_path + '/config', 'r') as filename_fp:
-            for line in filename_fp.readlines():
-                if line[0] != '#' and len(line) > 0:
-                    regex_string, template_string, compositor_string \
-                        = line.split()
-                    if dryrun:
-                        found = 'Found: re="{re}", template="{template}", ' + \
-                                'comp="{comp}"'
-                        print(found.format(
-                            re=regex_string, template=template_string,
-                            comp=compositor_string))
-                    regex = re.compile(regex_string)
-
-                    compositor = globals()[compositor_string](dryrun, verbose)
-                    self.actions[regex] = (template_string, compositor)
-                    if template_string not in self.templates:
-                        with open(site_config_path + '/' + template_string,
-                                  'r') as template_fp:
-                            self.templates[template_string] = jinja2.Template(
-                                template_fp.read())
-                    self.regexes.append(regex)
+            for line in filename_fp:
+                line = line.strip()
+                if not line or line[0] == '#':
+                    continue
+                regex_string, template_string, compositor_string \
+                    = line.split()
+                if dryrun:
+                    found = 'Found: re="{re}", template="{template}", ' + \
+                            'comp="{comp}"'
+                    print(found.format(
+                        re=regex_string, template=template_string,
+                        comp=compositor_string))
+                regex = re.compile(regex_string)
+
+                compositor = globals()[compositor_string](dryrun, verbose)
+                self.compiled_actions.append(
+                    (regex, template_string, compositor))
+        self.combined_regex = self.combine_regexes()
+
+    def combine_regexes(self):
+        """Return one regex that matches wherever any rule's regex does.
+
+        The rules' patterns are alternatives, in order, each in a
+        named group, so that a single match finds the first rule that
+        applies.  Patterns with groups of their own (whose numbering
+        would shift) or global inline flags (which would apply to all
+        alternatives) can't be combined, in which case return None.
+        """
+        default_flags = re.compile('').flags
+        patterns = []
+        for index, (regex, dummy_template, dummy_compositor) \
+                in enumerate(self.compiled_actions):
+            if regex.groups > 0 or regex.flags != default_flags:
+                return None
+            patterns.append('(?P<rule{index}>{pattern})'.format(
+                index=index, pattern=regex.pattern))
+        try:
+            return re.compile('|'.join(patterns))
+        except re.error:
+            return None
 
     def act_on_dir(self, dirname):
         """Note the directories shose existance we'll need to ensure.
         """
         self.directories.append(dirname)
 
-    def act_on_file(self, filename):
+    def get_template(self, template_name):
+        """Return the compiled template template_name, or None.
+
+        Templates are compiled on first use, so we don't pay for
+        templates that no file needs.  Once compiled, a template is
+        one dict lookup away.
+        """
+        template = self.templates.get(template_name, None)
+        if template is None:
+            try:
+                template = self.env.get_template(template_name)
+            except jinja2.TemplateNotFound:
+                return None
+            self.templates[template_name] = template
+        return template
+
+    def find_action(self, filename):
+        """Return the (regex, template, compositor) that applies to filename.
+
+        This is the first rule whose regex matches, or None.
+        """
+        if self.combined_regex is not None:
+            match = self.combined_regex.match(filename)
+            if match is None:
+                return None
+            return self.compiled_actions[int(match.lastgroup[len('rule'):])]
+        for action in self.compiled_actions:
+            if action[0].match(filename):
+                return action
+        return None
+
+    def act_on_file(self, filename, mtime=None):
         """Do whatever we need to do with the path filename.
+
+        If known, mtime is the file's modification time.
         """
-        for regex in self.regexes:
-            if regex.match(filename):
-                template, compositor = self.actions.get(regex, (None, None))
-                if self.verbose:
-                    print('  Matched: {re:35}  {template:13}  {fn}'.format(
-                        fn=filename, re=str(regex), template=template))
-                if compositor is None:
-                    print('Missing compositor for {fn}'.format(fn=filename))
-                    return
-                else:
-                    template_contents = self.templates.get(template, None)
-                    if template_contents is None:
-                        print('No template available: {template}'.format(
-                            template=template))
-                        return
-                    else:
-                        compositor.composite(filename, template_contents)
-                        return
-        print('No path match for {fn}'.format(fn=filename))
+        action = self.find_action(filename)
+        if action is None:
+            print('No path match for {fn}'.format(fn=filename))
+            return
+        regex, template, compositor = action
+        if self.verbose:
+            print('  Matched: {re:35}  {template:13}  {fn}'.format(
+                fn=filename, re=str(regex), template=template))
+        if compositor is None:
+            print('Missing compositor for {fn}'.format(fn=filename))
+            return
+        if self.dryrun:
+            # Compositors don't render anything in a dry run.
+            template_contents = None
+        else:
+            template_contents = self.get_template(template)
+            if template_contents is None:
+                print('No template available: {template}'.format(
+                    template=template))
+                return
+        compositor.composite(filename, template_contents, mtime)
 
     def write_all(self, production_path):
         """Tell all compositors to write and prepare for clean-up.
 
-        The production_path is the string to prepend to all page
+        The production_path is the directory to prepend to all page
         filenames, since we write production in a different directory
-        than the source.
+        than the source.  We join paths rather than changing directory,
+        since the current directory is shared by threads and inherited
+        by worker processes.
 
         """
-        os.chdir(production_path)
+        # Creating a directory creates its parents, so it's enough to
+        # create the leaves of the tree.
+        parents = set(os.path.dirname(directory)
+                      for directory in self.directories)
         for directory in self.directories:
-            if os.path.exists(directory):
-                if not os.path.isdir(directory):
-                    print('File "{dir}" exists but is not a directory.'.format(
-                        dir=directory))
-            else:
-                os.mkdir(directory, mode=0o755)
-        for dummy_template, compositor in self.actions.values():
-            compositor.write()
+            if directory in parents:
+                continue
+            try:
+                os.makedirs(os.path.join(production_path, directory),
+                            mode=0o755, exist_ok=True)
+            except (FileExistsError, NotADirectoryError) as error:
+                print('Can\'t create directory "{dir}": {err}'.format(
+                    dir=directory, err=str(error)))
+        # Rendering pages and copying images are independent of each
+        # other and largely CPU bound, so spread them across processes.
+        with ProcessPoolExecutor() as executor:
+            for dummy_regex, dummy_template, compositor \
+                    in self.compiled_actions:
+                compositor.write(production_path, executor)
+
+def scan_tree(top):
+    """Walk the directory tree at top, as os.walk() does.
+
+    Yield (dirname, file_entries) pairs, top-down, where file_entries
+    are the os.DirEntry objects of the files in dirname.  A DirEntry
+    caches its stat() result, and on some platforms gets it for free
+    from the directory listing.
+    """
+    subdir_entries = []
+    file_entries = []
+    try:
+        with os.scandir(top) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    file_entries.append(entry)
+                elif not entry.is_symlink():
+                    # Like os.walk(), don't follow links to directories.
+                    subdir_entries.append(entry)
+    except OSError:
+        return
+    yield top, file_entries
+    for entry in subdir_entries:
+        yield from scan_tree(entry.path)
 
 def main():
     """Do what we do."""
@@ -480,19 +694,23 @@ def main():
                         help='Be terribly informative of what happens')
     args = parser.parse_args()
 
-    site = Site(args.config_path, args.source_path, args.dryrun, args.verbose)
-
     # I want to get relative paths to make it easier on file creation
     # at destination_path.  In addition, I want to make sure that I
     # never match a pattern rule on an artifact of the full source
     # path name.
     initial_path = os.getcwd()  # Probably could simplify with unipath.
+    config_path = os.path.abspath(args.config_path)
     os.chdir(args.source_path)
-    for dir_name, dummy_subdir_list, file_list in os.walk('.'):
+    site = Site(config_path, os.getcwd(), args.dryrun, args.verbose)
+    for dir_name, file_entries in scan_tree('.'):
         site.act_on_dir(dir_name)
-        for filename in file_list:
-            # print('tree walk: found "{fn}"'.format(fn=filename))
-            site.act_on_file(os.path.join(dir_name, filename))
+        for entry in file_entries:
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                # Leave it to the compositor to complain, if it cares.
+                mtime = None
+            site.act_on_file(entry.path, mtime)
     os.chdir(initial_path)
     site.write_all(args.destination_path)
 